@@ -1,9 +1,31 @@
+import hashlib
 import json
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from operator import itemgetter
 from zoneinfo import ZoneInfo
 from pathlib import Path
 
+import numpy as np
+import openpyxl
 import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+from pandas._libs.parsers import STR_NA_VALUES
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+try:
+    import blake3
+except ImportError:  # optional; hashlib.blake2b is used instead
+    blake3 = None
+
+try:
+    import python_calamine  # enables pandas' calamine engine
+except ImportError:  # optional; openpyxl is used instead
+    python_calamine = None
 
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -11,14 +33,29 @@ SOURCE_XLSX = REPO_ROOT / "source" / "project_dashboard.xlsx"
 
 RISKS_JSON = REPO_ROOT / "data" / "risks.json"
 TQS_JSON = REPO_ROOT / "data" / "tqs.json"
+SOURCE_HASH = REPO_ROOT / "data" / ".xlsx.hash"
 
 RISK_SHEET_CANDIDATES = ["Risks", "Risk"]
 TQ_SHEET_CANDIDATES = ["TQs", "TQ", "Tqs"]
 
+RISK_COLUMNS = frozenset({"risk_id", "title", "status", "rating", "due_date", "owner_role", "last_updated"})
+TQ_COLUMNS = frozenset({"tq_id", "title", "status"})  # Minimal TQ schema (matches what you have)
+
+_RATING_MAP = {
+    "red": "Red", "r": "Red", "high": "Red",
+    "amber": "Amber", "orange": "Amber", "a": "Amber", "medium": "Amber", "med": "Amber",
+    "green": "Green", "g": "Green", "low": "Green",
+}
+RATING_CATEGORIES = ["Red", "Amber", "Green", ""]
+
+# Cell text pd.read_excel treats as missing; values_only also returns
+# formula errors as their text, which pandas reads as NaN too
+NA_STRINGS = list(STR_NA_VALUES | set(ERROR_CODES))
+
 
-def find_sheet_name(xls: pd.ExcelFile, candidates: list[str]) -> str | None:
+def find_sheet_name(sheet_names: list[str], candidates: list[str]) -> str | None:
     for name in candidates:
-        if name in xls.sheet_names:
+        if name in sheet_names:
             return name
     return None
 
@@ -38,16 +75,7 @@ def normalise_rating(x) -> str:
     s = as_text(x).strip()
     if not s:
         return ""
-    s_low = s.lower()
-
-    if s_low in {"red", "r", "high"}:
-        return "Red"
-    if s_low in {"amber", "orange", "a", "medium", "med"}:
-        return "Amber"
-    if s_low in {"green", "g", "low"}:
-        return "Green"
-
-    return s[:1].upper() + s[1:].lower()
+    return _RATING_MAP.get(s.lower()) or (s[:1].upper() + s[1:].lower())
 
 
 def to_iso_date(val) -> str:
@@ -71,101 +99,241 @@ def to_iso_date(val) -> str:
     return as_text(val).strip()
 
 
-def read_sheet_df(sheet_name: str) -> pd.DataFrame:
-    return pd.read_excel(
-        SOURCE_XLSX,
-        sheet_name=sheet_name,
-        engine="openpyxl",
+def require_columns(label: str, expected: frozenset[str], found: list) -> None:
+    missing = expected.difference(found)
+    if missing:
+        raise ValueError(f"{label} sheet missing columns: {sorted(missing)}. Found: {list(found)}")
+
+
+def header_names(header) -> list:
+    # Blank header cells are reported the way pandas names them
+    return [f"Unnamed: {i}" if name is None or name == "" else name for i, name in enumerate(header)]
+
+
+def read_sheet_df(wb: openpyxl.Workbook, sheet_name: str, label: str, columns: frozenset[str]) -> pd.DataFrame:
+    ws = wb[sheet_name]
+    # Read-only mode trusts the stored <dimension>, which can be stale
+    ws.reset_dimensions()
+
+    # Stream cell values in one pass; first row is the header
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, ())
+    # Check against the full header so the error lists misnamed columns too
+    require_columns(label, columns, header_names(header))
+
+    # Only keep the columns the builders use. A repeated header keeps its
+    # first column, as pandas does (it renames later copies to "name.1")
+    first: dict[str, int] = {}
+    for i, name in enumerate(header):
+        if name in columns:
+            first.setdefault(name, i)
+    positions = list(first.values())
+    data = []
+    if positions:
+        pick = itemgetter(*positions)
+        width = positions[-1] + 1
+        pad = (None,) * width
+        # Without dimensions, rows stop at their last non-empty cell
+        data = [pick(row) if len(row) >= width else pick((*row, *pad)) for row in rows]
+    df = pd.DataFrame(
+        data,
+        columns=[header[i] for i in positions],
         dtype=object,  # keep dates as dates; keep ids stable
-    ).dropna(how="all")
+    )
+    return df.mask(df.isin(NA_STRINGS)).dropna(how="all")
+
+
+def text_column(col: pd.Series) -> np.ndarray:
+    return col.astype("string").fillna("").str.strip().to_numpy(dtype=object)
+
+
+def shared_strings(values: np.ndarray) -> np.ndarray:
+    # Repeated values end up referencing a single str object each
+    codes, uniques = pd.factorize(values)
+    return uniques[codes]
+
+
+def rating_column(col: pd.Series) -> np.ndarray:
+    s = col.astype("string").fillna("").str.strip()
+    rating = s.str.lower().map(_RATING_MAP)
+    # Blanks and non-standard ratings fall back to the scalar rules
+    unmapped = rating.isna()
+    if unmapped.any():
+        rating[unmapped] = s[unmapped].map(normalise_rating)
+
+    # Fixed categories first; unrecognised ratings are kept as extra categories
+    extras = sorted(set(rating.unique()).difference(RATING_CATEGORIES))
+    cat = pd.Categorical(rating, categories=[*RATING_CATEGORIES, *extras])
+    return np.asarray(cat.categories, dtype=object)[cat.codes]
+
+
+def iso_date_column(col: pd.Series) -> np.ndarray:
+    # Only cells holding real dates are formatted; text passes through
+    # as-is, like to_iso_date, so day-first strings are never re-read
+    is_date = col.map(lambda v: isinstance(v, date)).to_numpy(dtype=bool)
+    iso = text_column(col)
+    if is_date.any():
+        dates = col[is_date]
+        dt = pd.to_datetime(dates, errors="coerce")
+        formatted = dt.dt.strftime("%Y-%m-%d")
+        # strftime doesn't zero-pad years below 1000; those (and anything
+        # to_datetime can't hold) go through the scalar path
+        odd = dt.isna() | (dt.dt.year < 1000)
+        if odd.any():
+            formatted[odd] = dates[odd].map(to_iso_date)
+        iso[is_date] = formatted.to_numpy(dtype=object)
+    return iso
 
 
 def build_risks(df: pd.DataFrame) -> list[dict]:
-    expected = {"risk_id", "title", "status", "rating", "due_date", "owner_role", "last_updated"}
-    missing = expected - set(df.columns)
-    if missing:
-        raise ValueError(f"Risks sheet missing columns: {sorted(missing)}. Found: {list(df.columns)}")
-
-    items: list[dict] = []
-    for _, row in df.iterrows():
-        risk_id = as_text(row.get("risk_id")).strip()
-        title = as_text(row.get("title")).strip()
-
-        if not risk_id and not title:
-            continue
-
-        items.append(
-            {
-                "id": risk_id,
-                "description": title,
-                "status": as_text(row.get("status")).strip(),
-                "rating": normalise_rating(row.get("rating")),
-                "ownerRole": as_text(row.get("owner_role")).strip(),
-                "nextActionDate": to_iso_date(row.get("due_date")),
-                "lastUpdatedRow": to_iso_date(row.get("last_updated")),
-            }
-        )
-    return items
+    require_columns("Risks", RISK_COLUMNS, df.columns)
+
+    # Drop blank rows up front so the remaining columns only convert kept rows
+    risk_id = text_column(df["risk_id"])
+    title = text_column(df["title"])
+    keep = np.flatnonzero((risk_id != "") | (title != ""))
+    rows = df.iloc[keep]
+
+    columns = [
+        risk_id[keep],
+        title[keep],
+        shared_strings(text_column(rows["status"])),
+        rating_column(rows["rating"]),
+        shared_strings(text_column(rows["owner_role"])),
+        iso_date_column(rows["due_date"]),
+        iso_date_column(rows["last_updated"]),
+    ]
+    return [
+        {
+            "id": rid,
+            "description": t,
+            "status": st,
+            "rating": rt,
+            "ownerRole": owner,
+            "nextActionDate": due,
+            "lastUpdatedRow": updated,
+        }
+        for rid, t, st, rt, owner, due, updated in zip(*columns)
+    ]
 
 
 def build_tqs(df: pd.DataFrame) -> list[dict]:
-    # Minimal TQ schema (matches what you have)
-    expected = {"tq_id", "title", "status"}
-    missing = expected - set(df.columns)
-    if missing:
-        raise ValueError(f"TQs sheet missing columns: {sorted(missing)}. Found: {list(df.columns)}")
-
-    items: list[dict] = []
-    for _, row in df.iterrows():
-        tq_id = as_text(row.get("tq_id")).strip()
-        title = as_text(row.get("title")).strip()
-
-        if not tq_id and not title:
-            continue
-
-        items.append(
-            {
-                "id": tq_id,
-                "title": title,
-                "status": as_text(row.get("status")).strip(),
-            }
-        )
-    return items
+    require_columns("TQs", TQ_COLUMNS, df.columns)
+
+    tq_id = text_column(df["tq_id"])
+    title = text_column(df["title"])
+    keep = np.flatnonzero((tq_id != "") | (title != ""))
+
+    columns = [tq_id[keep], title[keep], shared_strings(text_column(df["status"].iloc[keep]))]
+    return [
+        {"id": tid, "title": t, "status": st}
+        for tid, t, st in zip(*columns)
+    ]
 
 
 def write_json(path: Path, payload: dict):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with path.open("w", encoding="utf-8", newline="\n") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+
+
+def resolve_sheets(sheet_names: list[str]) -> tuple[str, str]:
+    risk_sheet = find_sheet_name(sheet_names, RISK_SHEET_CANDIDATES)
+    if not risk_sheet:
+        raise ValueError(f"No risks sheet found. Tried {RISK_SHEET_CANDIDATES}. Found: {sheet_names}")
+
+    tq_sheet = find_sheet_name(sheet_names, TQ_SHEET_CANDIDATES)
+    if not tq_sheet:
+        raise ValueError(f"No TQs sheet found. Tried {TQ_SHEET_CANDIDATES}. Found: {sheet_names}")
+
+    return risk_sheet, tq_sheet
+
+
+def read_source_sheets() -> tuple[str, pd.DataFrame, str, pd.DataFrame]:
+    if python_calamine is not None:
+        with pd.ExcelFile(SOURCE_XLSX, engine="calamine") as xls:
+            risk_sheet, tq_sheet = resolve_sheets(xls.sheet_names)
+            # usecols hides unmatched headers, so check the full header rows first
+            for sheet, label, columns in ((risk_sheet, "Risks", RISK_COLUMNS), (tq_sheet, "TQs", TQ_COLUMNS)):
+                header = next(iter(xls.book.get_sheet_by_name(sheet).to_python(nrows=1)), [])
+                require_columns(label, columns, header_names(header))
+
+            frames = pd.read_excel(
+                xls,
+                sheet_name=[risk_sheet, tq_sheet],
+                dtype=object,
+                usecols=lambda c: c in RISK_COLUMNS or c in TQ_COLUMNS,
+            )
+        return (
+            risk_sheet,
+            frames[risk_sheet].dropna(how="all"),
+            tq_sheet,
+            frames[tq_sheet].dropna(how="all"),
+        )
+
+    wb = openpyxl.load_workbook(SOURCE_XLSX, read_only=True, data_only=True)
+    try:
+        risk_sheet, tq_sheet = resolve_sheets(wb.sheetnames)
+        return (
+            risk_sheet,
+            read_sheet_df(wb, risk_sheet, "Risks", RISK_COLUMNS),
+            tq_sheet,
+            read_sheet_df(wb, tq_sheet, "TQs", TQ_COLUMNS),
+        )
+    finally:
+        wb.close()
+
+
+def source_fingerprint() -> str:
+    # Include this script so parsing changes still regenerate the JSON
+    hasher = blake3.blake3() if blake3 is not None else hashlib.blake2b(digest_size=16)
+    hasher.update(SOURCE_XLSX.read_bytes())
+    hasher.update(Path(__file__).read_bytes())
+    return f"{hasher.name}:{hasher.hexdigest()}"
 
 
 def main():
     if not SOURCE_XLSX.exists():
         raise FileNotFoundError(f"Missing source workbook: {SOURCE_XLSX}")
 
-    xls = pd.ExcelFile(SOURCE_XLSX, engine="openpyxl")
+    fingerprint = source_fingerprint()
+    if (
+        SOURCE_HASH.exists()
+        and SOURCE_HASH.read_text(encoding="utf-8").strip() == fingerprint
+        and RISKS_JSON.exists()
+        and TQS_JSON.exists()
+    ):
+        print(f"{SOURCE_XLSX} unchanged since last run; skipping")
+        return
+
+    # Parse synchronously (workbook readers aren't thread-safe)
+    risk_sheet, risks_df, tq_sheet, tqs_df = read_source_sheets()
 
     now_awst = datetime.now(ZoneInfo("Australia/Perth")).strftime("%Y-%m-%d %H:%M AWST")
 
-    # --- Risks ---
-    risk_sheet = find_sheet_name(xls, RISK_SHEET_CANDIDATES)
-    if not risk_sheet:
-        raise ValueError(f"No risks sheet found. Tried {RISK_SHEET_CANDIDATES}. Found: {xls.sheet_names}")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # Both item lists must build before either file is written, so a
+        # failure in one sheet never leaves the other JSON freshly stamped
+        risks_build = pool.submit(build_risks, risks_df)
+        tqs_build = pool.submit(build_tqs, tqs_df)
+        risks_items = risks_build.result()
+        tqs_items = tqs_build.result()
+
+        writes = [
+            pool.submit(write_json, RISKS_JSON, {"lastUpdated": now_awst, "items": risks_items}),
+            pool.submit(write_json, TQS_JSON, {"lastUpdated": now_awst, "items": tqs_items}),
+        ]
+        for write in writes:
+            write.result()
 
-    risks_df = read_sheet_df(risk_sheet)
-    risks_items = build_risks(risks_df)
-    write_json(RISKS_JSON, {"lastUpdated": now_awst, "items": risks_items})
     print(f"Wrote {RISKS_JSON} with {len(risks_items)} items from sheet '{risk_sheet}'")
-
-    # --- TQs ---
-    tq_sheet = find_sheet_name(xls, TQ_SHEET_CANDIDATES)
-    if not tq_sheet:
-        raise ValueError(f"No TQs sheet found. Tried {TQ_SHEET_CANDIDATES}. Found: {xls.sheet_names}")
-
-    tqs_df = read_sheet_df(tq_sheet)
-    tqs_items = build_tqs(tqs_df)
-    write_json(TQS_JSON, {"lastUpdated": now_awst, "items": tqs_items})
     print(f"Wrote {TQS_JSON} with {len(tqs_items)} items from sheet '{tq_sheet}'")
 
+    SOURCE_HASH.write_text(fingerprint + "\n", encoding="utf-8")
+
 
 if __name__ == "__main__":
     main()